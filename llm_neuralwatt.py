@@ -1,12 +1,50 @@
 import llm
 from llm.default_plugins.openai_models import _Shared
-from llm.default_plugins.openai_models import (
-    remove_dict_none_values,
-    combine_chunks,
-)
+from llm.default_plugins.openai_models import remove_dict_none_values
+from llm.utils import logging_client
 import openai
 from openai._streaming import SSEDecoder, ServerSentEvent
+import functools
+import importlib.util
 import json
+import os
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+# Neuralwatt sends energy data as an SSE comment line: `: energy {...}`
+_ENERGY_COMMENT = ": energy "
+_ENERGY_PREFIX = _ENERGY_COMMENT.encode()
+_ENERGY_PREFIX_LEN = len(_ENERGY_PREFIX)
+
+
+def _parse_json(data):
+    """Parse JSON with orjson when installed, falling back to the stdlib."""
+    try:
+        return _loads(data)
+    except ValueError:
+        # orjson is stricter than the stdlib: it rejects NaN and lone
+        # surrogate escapes, such as an emoji pair split across chunks
+        return json.loads(data)
+
+
+class NeuralWattServerSentEvent(ServerSentEvent):
+    """ServerSentEvent whose json() uses orjson when it is installed."""
+
+    def json(self):
+        return _parse_json(self.data)
+
+
+@functools.cache
+def _http2_available():
+    # Look for h2 without importing it, and only once a client is needed,
+    # so loading the plugin on every llm invocation doesn't pay for it
+    return importlib.util.find_spec("h2") is not None
 
 
 class EnergyCapturingSSEDecoder(SSEDecoder):
@@ -16,42 +54,85 @@ class EnergyCapturingSSEDecoder(SSEDecoder):
     Neuralwatt sends energy data as an SSE comment (`: energy {...}`) just
     before the [DONE] marker. The standard SSEDecoder ignores comments per
     the SSE spec, so we override decode() to capture energy data.
+
+    Only the raw payloads are kept while streaming; they are parsed the
+    first time energy_data is read, once the stream has finished. The
+    newest payload that parses wins, so a malformed comment never replaces
+    good data seen earlier.
     """
     
     def __init__(self):
         super().__init__()
-        self.energy_data = None
+        self._energy_raw = []
+        self._energy_parsed = None
+
+    @property
+    def energy_data(self):
+        pending = self._energy_raw
+        while pending:
+            try:
+                self._energy_parsed = _parse_json(pending.pop())
+            except ValueError:
+                # json.JSONDecodeError and orjson.JSONDecodeError both
+                # subclass ValueError. Fall back to an earlier payload.
+                continue
+            pending.clear()
+        return self._energy_parsed
+
+    def _set_energy_raw(self, energy_json):
+        self._energy_raw.append(energy_json)
     
     def decode(self, line: str) -> ServerSentEvent | None:
-        # Check for energy comment before the parent ignores it
-        if line.startswith(": energy "):
-            energy_json = line[9:]  # Skip ": energy "
-            try:
-                self.energy_data = json.loads(energy_json)
-            except json.JSONDecodeError:
-                pass
+        # Check for energy comment before the parent ignores it. Nearly
+        # every line is a data line, which fails the one-character test.
+        if line[:1] == ":" and line.startswith(_ENERGY_COMMENT):
+            self._set_energy_raw(line[_ENERGY_PREFIX_LEN:])
             return None  # Don't emit as an event
         
         # Fall back to standard SSE decoding
-        return super().decode(line)
+        sse = super().decode(line)
+        if sse is not None and orjson is not None:
+            # The SDK calls sse.json() on every chunk, so hand it an event
+            # that parses with orjson instead of the stdlib json module
+            sse = NeuralWattServerSentEvent(
+                event=sse.event, data=sse.data, id=sse.id, retry=sse.retry
+            )
+        return sse
+
+    def _decode_lines(self, lines):
+        # The parent decodes every raw line to str before looking at it.
+        # Comment lines never produce an event, so handle them on the raw
+        # bytes and only decode the lines the parent actually needs.
+        decode = self.decode
+        for raw_line in lines:
+            if raw_line[:1] == b":":
+                if raw_line.startswith(_ENERGY_PREFIX):
+                    self._set_energy_raw(raw_line[_ENERGY_PREFIX_LEN:])
+                continue
+            sse = decode(raw_line.decode("utf-8"))
+            if sse:
+                yield sse
 
 
-class NeuralWattOpenAI(openai.OpenAI):
+class EnergyCapturingClientMixin:
     """
-    OpenAI client subclass that captures Neuralwatt energy data from streams.
-    
+    Shared energy capture for the sync and async OpenAI client subclasses.
+
     Overrides _make_sse_decoder() to use EnergyCapturingSSEDecoder, which
-    captures the energy comment that Neuralwatt sends before [DONE].
+    captures the energy comment that Neuralwatt sends before [DONE]. The
+    decoder keeps the raw energy payloads and parses them, newest first,
+    when energy_data is read, so the client just keeps a reference to the
+    last decoder it handed out and asks it once the stream has finished.
     """
-    
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._last_decoder = None
-    
+
     def _make_sse_decoder(self):
         self._last_decoder = EnergyCapturingSSEDecoder()
         return self._last_decoder
-    
+
     def get_last_energy_data(self):
         """Get energy data captured from the last streaming request."""
         if self._last_decoder:
@@ -59,68 +140,134 @@ class NeuralWattOpenAI(openai.OpenAI):
         return None
 
 
-class NeuralWattAsyncOpenAI(openai.AsyncOpenAI):
+class NeuralWattOpenAI(EnergyCapturingClientMixin, openai.OpenAI):
+    """
+    OpenAI client subclass that captures Neuralwatt energy data from streams.
+    """
+
+
+class NeuralWattAsyncOpenAI(EnergyCapturingClientMixin, openai.AsyncOpenAI):
     """
     AsyncOpenAI client subclass that captures Neuralwatt energy data from streams.
     """
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._last_decoder = None
-    
-    def _make_sse_decoder(self):
-        self._last_decoder = EnergyCapturingSSEDecoder()
-        return self._last_decoder
-    
-    def get_last_energy_data(self):
-        """Get energy data captured from the last streaming request."""
-        if self._last_decoder:
-            return self._last_decoder.energy_data
-        return None
+
+
+class ChunkCombiner:
+    """
+    Combines streamed chat completion chunks as they arrive.
+
+    Builds the same dict as remove_dict_none_values(combine_chunks(...)) in
+    llm, but folds each chunk in immediately instead of keeping every chunk
+    alive until the end of the stream, and never inserts None values so
+    only the usage dict needs a cleanup pass. Tool call fragments are
+    collected by index along the way.
+    """
+
+    def __init__(self):
+        self.content_parts = []
+        self.role = None
+        self.finish_reason = None
+        self.logprobs = []
+        # The raw usage dump, None values included, as set_usage() expects
+        self.usage = None
+        self.metadata = None
+        # index -> (first tool call delta, argument fragments)
+        self.tool_calls = {}
+
+    def add(self, chunk):
+        """
+        Fold in a chunk, returning the text it adds to the first choice.
+
+        Returns None if the chunk carries no text.
+        """
+        if self.metadata is None:
+            # Imitations of the OpenAI API may be missing some of these fields
+            self.metadata = {}
+            for key in ("id", "object", "model", "created", "index"):
+                value = getattr(chunk, key, None)
+                if value is not None:
+                    self.metadata[key] = value
+        usage = chunk.usage
+        if usage:
+            self.usage = usage.model_dump()
+        for choice in chunk.choices:
+            logprobs = choice.logprobs
+            if logprobs and hasattr(logprobs, "top_logprobs"):
+                self.logprobs.append({"top_logprobs": logprobs.top_logprobs})
+            delta = choice.delta
+            self.role = delta.role
+            content = delta.content
+            if content is not None:
+                self.content_parts.append(content)
+            finish_reason = choice.finish_reason
+            if finish_reason is not None:
+                self.finish_reason = finish_reason
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        tool_calls = delta.tool_calls
+        if tool_calls:
+            # Most chunks carry only text, so only enter this when needed
+            for tool_call in tool_calls:
+                # Arguments arrive in fragments; join them once at the end
+                arguments = tool_call.function.arguments or ""
+                index = tool_call.index
+                if index not in self.tool_calls:
+                    self.tool_calls[index] = (tool_call, [arguments])
+                else:
+                    self.tool_calls[index][1].append(arguments)
+        return delta.content
+
+    def combined(self):
+        """Return the combined response, without any None values."""
+        combined = {"content": "".join(self.content_parts)}
+        if self.role is not None:
+            combined["role"] = self.role
+        if self.finish_reason is not None:
+            combined["finish_reason"] = self.finish_reason
+        if self.usage:
+            # A fresh copy, so set_usage() popping keys can't alter it
+            usage = remove_dict_none_values(self.usage)
+            if usage:
+                combined["usage"] = usage
+        if self.logprobs:
+            combined["logprobs"] = self.logprobs
+        if self.metadata:
+            combined.update(self.metadata)
+        return combined
+
+
+_API_BASE = "https://api.neuralwatt.com/v1"
+
+# (model_id, model_name, aliases) for each model served by Neuralwatt
+_MODELS = (
+    (
+        "neuralwatt/deepseek-coder-33b-instruct",
+        "deepseek-ai/deepseek-coder-33b-instruct",
+        ("neuralwatt-deepseek-coder",),
+    ),
+    (
+        "neuralwatt/gpt-oss-20b",
+        "openai/gpt-oss-20b",
+        ("neuralwatt-gpt-oss",),
+    ),
+    (
+        "neuralwatt/Qwen3-Coder-480B-A35B-Instruct",
+        "Qwen/Qwen3-Coder-480B-A35B-Instruct",
+        ("neuralwatt-qwen3-coder",),
+    ),
+)
 
 
 @llm.hookimpl
 def register_models(register):
     # Register NeuralWatt models with full energy tracking
-    register(
-        NeuralWattChat(
-            "neuralwatt/deepseek-coder-33b-instruct",
-            model_name="deepseek-ai/deepseek-coder-33b-instruct",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        NeuralWattAsyncChat(
-            "neuralwatt/deepseek-coder-33b-instruct",
-            model_name="deepseek-ai/deepseek-coder-33b-instruct",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        aliases=("neuralwatt-deepseek-coder",),
-    )
-    register(
-        NeuralWattChat(
-            "neuralwatt/gpt-oss-20b",
-            model_name="openai/gpt-oss-20b",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        NeuralWattAsyncChat(
-            "neuralwatt/gpt-oss-20b",
-            model_name="openai/gpt-oss-20b",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        aliases=("neuralwatt-gpt-oss",),
-    )
-    register(
-        NeuralWattChat(
-            "neuralwatt/Qwen3-Coder-480B-A35B-Instruct",
-            model_name="Qwen/Qwen3-Coder-480B-A35B-Instruct",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        NeuralWattAsyncChat(
-            "neuralwatt/Qwen3-Coder-480B-A35B-Instruct",
-            model_name="Qwen/Qwen3-Coder-480B-A35B-Instruct",
-            api_base="https://api.neuralwatt.com/v1",
-        ),
-        aliases=("neuralwatt-qwen3-coder",),
-    )
+    for model_id, model_name, aliases in _MODELS:
+        register(
+            NeuralWattChat(model_id, model_name=model_name, api_base=_API_BASE),
+            NeuralWattAsyncChat(model_id, model_name=model_name, api_base=_API_BASE),
+            aliases=aliases,
+        )
 
 
 class NeuralWattShared(_Shared):
@@ -134,6 +281,9 @@ class NeuralWattShared(_Shared):
         else:
             self.needs_key = "neuralwatt"
         self.key_env_var = "NEURALWATT_API_KEY"
+        # The model name sent to the API never changes for an instance
+        self._request_model = self.model_name or self.model_id
+        self._http_client = None
 
     def __str__(self):
         return "Neuralwatt: {}".format(self.model_id)
@@ -145,9 +295,6 @@ class NeuralWattShared(_Shared):
         Uses NeuralWattOpenAI/NeuralWattAsyncOpenAI subclasses that capture
         energy data from streaming responses.
         """
-        import os
-        from llm.utils import logging_client
-        
         kwargs = {}
         if self.api_base:
             kwargs["base_url"] = self.api_base
@@ -159,12 +306,66 @@ class NeuralWattShared(_Shared):
             kwargs["default_headers"] = self.headers
         if os.environ.get("LLM_OPENAI_SHOW_RESPONSES"):
             kwargs["http_client"] = logging_client()
+        elif not async_:
+            kwargs["http_client"] = self._get_http_client()
         
         if async_:
             return NeuralWattAsyncOpenAI(**kwargs)
         else:
             return NeuralWattOpenAI(**kwargs)
 
+    def _set_streamed_response(self, response, combiner, energy_data):
+        """Record combined streamed chunks, energy data and tool calls."""
+        response_json = combiner.combined()
+        if energy_data:
+            response_json["energy"] = energy_data
+        response.response_json = response_json
+        for tool_call, argument_parts in combiner.tool_calls.values():
+            response.add_tool_call(
+                llm.ToolCall(
+                    tool_call_id=tool_call.id,
+                    name=tool_call.function.name,
+                    arguments=json.loads("".join(argument_parts) or "{}"),
+                )
+            )
+
+    def _set_completion_response(self, response, completion):
+        """Record a non-streamed completion, including energy and tool calls."""
+        # Preserve ALL data including energy. Dropping None fields in
+        # pydantic-core first leaves remove_dict_none_values() only the
+        # empty nested dicts and the None values in the untyped energy
+        # dict to prune.
+        response_data = completion.model_dump(exclude_none=True)
+        response.response_json = remove_dict_none_values(response_data)
+        for tool_call in completion.choices[0].message.tool_calls or []:
+            response.add_tool_call(
+                llm.ToolCall(
+                    tool_call_id=tool_call.id,
+                    name=tool_call.function.name,
+                    arguments=json.loads(tool_call.function.arguments)
+                    if isinstance(tool_call.function.arguments, str)
+                    else tool_call.function.arguments,
+                )
+            )
+
+    def _get_http_client(self):
+        """
+        Get a pooled HTTP client that is reused across sync requests.
+
+        A new OpenAI client is built for every prompt, but sharing the
+        underlying HTTP client keeps connections to the API alive between
+        prompts instead of paying for a fresh TCP and TLS handshake each
+        time. HTTP/2 is used when the h2 package is installed.
+
+        Async clients are not pooled: their connections hold on to the
+        event loop that opened them, and llm typically runs each async
+        prompt in its own asyncio.run() loop, so a cached client would
+        keep every finished loop and its sockets alive.
+        """
+        if self._http_client is None:
+            self._http_client = openai.DefaultHttpxClient(http2=_http2_available())
+        return self._http_client
+
 
 class NeuralWattChat(NeuralWattShared, llm.KeyModel):
     default_max_tokens = None
@@ -183,74 +384,32 @@ class NeuralWattChat(NeuralWattShared, llm.KeyModel):
 
         if stream:
             completion = client.chat.completions.create(
-                model=self.model_name or self.model_id,
+                model=self._request_model,
                 messages=messages,
                 stream=True,
                 **kwargs,
             )
-            chunks = []
-            tool_calls = {}
+            combiner = ChunkCombiner()
+            add_chunk = combiner.add
 
             for chunk in completion:
-                chunks.append(chunk)
-                if chunk.usage:
-                    usage = chunk.usage.model_dump()
-                if chunk.choices and chunk.choices[0].delta:
-                    for tool_call in chunk.choices[0].delta.tool_calls or []:
-                        if tool_call.function.arguments is None:
-                            tool_call.function.arguments = ""
-                        index = tool_call.index
-                        if index not in tool_calls:
-                            tool_calls[index] = tool_call
-                        else:
-                            tool_calls[
-                                index
-                            ].function.arguments += tool_call.function.arguments
-                try:
-                    content = chunk.choices[0].delta.content
-                except IndexError:
-                    content = None
+                content = add_chunk(chunk)
                 if content is not None:
                     yield content
-            
-            # Combine chunks and add energy data
-            response_json = remove_dict_none_values(combine_chunks(chunks))
-            energy_data = client.get_last_energy_data()
-            if energy_data:
-                response_json["energy"] = energy_data
-            response.response_json = response_json
-            
-            if tool_calls:
-                for value in tool_calls.values():
-                    response.add_tool_call(
-                        llm.ToolCall(
-                            tool_call_id=value.id,
-                            name=value.function.name,
-                            arguments=json.loads(value.function.arguments),
-                        )
-                    )
+
+            self._set_streamed_response(
+                response, combiner, client.get_last_energy_data()
+            )
+            usage = combiner.usage
         else:
             completion = client.chat.completions.create(
-                model=self.model_name or self.model_id,
+                model=self._request_model,
                 messages=messages,
                 stream=False,
                 **kwargs,
             )
             usage = completion.usage.model_dump() if completion.usage else None
-            # Preserve ALL data including energy
-            response_data = completion.model_dump()
-            response.response_json = remove_dict_none_values(d=response_data)
-            
-            for tool_call in completion.choices[0].message.tool_calls or []:
-                response.add_tool_call(
-                    llm.ToolCall(
-                        tool_call_id=tool_call.id,
-                        name=tool_call.function.name,
-                        arguments=json.loads(tool_call.function.arguments)
-                        if isinstance(tool_call.function.arguments, str)
-                        else tool_call.function.arguments,
-                    )
-                )
+            self._set_completion_response(response, completion)
             if completion.choices[0].message.content is not None:
                 yield completion.choices[0].message.content
         
@@ -275,74 +434,32 @@ class NeuralWattAsyncChat(NeuralWattShared, llm.AsyncKeyModel):
 
         if stream:
             completion = await client.chat.completions.create(
-                model=self.model_name or self.model_id,
+                model=self._request_model,
                 messages=messages,
                 stream=True,
                 **kwargs,
             )
-            chunks = []
-            tool_calls = {}
+            combiner = ChunkCombiner()
+            add_chunk = combiner.add
 
             async for chunk in completion:
-                chunks.append(chunk)
-                if chunk.usage:
-                    usage = chunk.usage.model_dump()
-                if chunk.choices and chunk.choices[0].delta:
-                    for tool_call in chunk.choices[0].delta.tool_calls or []:
-                        if tool_call.function.arguments is None:
-                            tool_call.function.arguments = ""
-                        index = tool_call.index
-                        if index not in tool_calls:
-                            tool_calls[index] = tool_call
-                        else:
-                            tool_calls[
-                                index
-                            ].function.arguments += tool_call.function.arguments
-                try:
-                    content = chunk.choices[0].delta.content
-                except IndexError:
-                    content = None
+                content = add_chunk(chunk)
                 if content is not None:
                     yield content
 
-            # Combine chunks and add energy data
-            response_json = remove_dict_none_values(combine_chunks(chunks))
-            energy_data = client.get_last_energy_data()
-            if energy_data:
-                response_json["energy"] = energy_data
-            response.response_json = response_json
-
-            if tool_calls:
-                for value in tool_calls.values():
-                    response.add_tool_call(
-                        llm.ToolCall(
-                            tool_call_id=value.id,
-                            name=value.function.name,
-                            arguments=json.loads(value.function.arguments),
-                        )
-                    )
+            self._set_streamed_response(
+                response, combiner, client.get_last_energy_data()
+            )
+            usage = combiner.usage
         else:
             completion = await client.chat.completions.create(
-                model=self.model_name or self.model_id,
+                model=self._request_model,
                 messages=messages,
                 stream=False,
                 **kwargs,
             )
             usage = completion.usage.model_dump() if completion.usage else None
-            # Preserve ALL data including energy
-            response_data = completion.model_dump()
-            response.response_json = remove_dict_none_values(response_data)
-
-            for tool_call in completion.choices[0].message.tool_calls or []:
-                response.add_tool_call(
-                    llm.ToolCall(
-                        tool_call_id=tool_call.id,
-                        name=tool_call.function.name,
-                        arguments=json.loads(tool_call.function.arguments)
-                        if isinstance(tool_call.function.arguments, str)
-                        else tool_call.function.arguments,
-                    )
-                )
+            self._set_completion_response(response, completion)
             if completion.choices[0].message.content is not None:
                 yield completion.choices[0].message.content
         
@@ -0,0 +1,9 @@
+import pytest
+from llm.plugins import load_plugins, pm
+
+
+@pytest.fixture(scope="session")
+def loaded_plugins():
+    """Names of the registered llm plugins, scanned once per test session."""
+    load_plugins()
+    return [mod.__name__ for mod in pm.get_plugins()]
@@ -1,7 +1,148 @@
-from llm.plugins import load_plugins, pm
+import asyncio
+import gc
+import http.server
+import json
+import os
+import threading
+import weakref
 
+import pytest
 
-def test_plugin_is_installed():
-    load_plugins()
-    names = [mod.__name__ for mod in pm.get_plugins()]
-    assert "llm_neuralwatt" in names
+from llm_neuralwatt import NeuralWattAsyncChat, NeuralWattChat
+
+
+_COMPLETION = json.dumps(
+    {
+        "id": "chatcmpl-abc123",
+        "object": "chat.completion",
+        "created": 1737000000,
+        "model": "test-model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "Hello"},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        "energy": {"energy_joules": 1.0},
+    }
+).encode()
+
+
+_STREAM = b"".join(
+    b"data: " + json.dumps(chunk).encode() + b"\n\n"
+    for chunk in [
+        {
+            "id": "chatcmpl-abc123",
+            "object": "chat.completion.chunk",
+            "created": 1737000000,
+            "model": "test-model",
+            "choices": [{"index": 0, "delta": {"content": "Hello"}}],
+        },
+        {
+            "id": "chatcmpl-abc123",
+            "object": "chat.completion.chunk",
+            "created": 1737000000,
+            "model": "test-model",
+            "choices": [],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": None},
+        },
+    ]
+) + b': energy {"energy_joules": 1.0}\n\ndata: [DONE]\n\n'
+
+
+class _CompletionHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if request.get("stream"):
+            body, content_type = _STREAM, "text/event-stream"
+        else:
+            body, content_type = _COMPLETION, "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_base():
+    """A local OpenAI-compatible server that answers every completion."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _CompletionHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}/v1".format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_plugin_is_installed(loaded_plugins):
+    assert "llm_neuralwatt" in loaded_plugins
+
+
+def test_http_client_is_reused():
+    model = NeuralWattChat("neuralwatt/test-model", model_name="test-model")
+    first = model.get_client("key")
+    second = model.get_client("key")
+    assert first is not second
+    assert first._client is second._client
+
+
+def test_streamed_usage_with_null_field(api_base):
+    """A null usage field is dropped from the log without breaking set_usage()."""
+    model = NeuralWattChat(
+        "neuralwatt/test-model", model_name="test-model", api_base=api_base
+    )
+    response = model.prompt("Hi", key="key", stream=True)
+
+    assert response.text() == "Hello"
+    assert response.response_json["usage"] == {
+        "prompt_tokens": 1,
+        "completion_tokens": 1,
+    }
+    assert response.response_json["energy"] == {"energy_joules": 1.0}
+    assert (response.input_tokens, response.output_tokens) == (1, 1)
+
+
+def test_async_client_outside_event_loop():
+    model = NeuralWattAsyncChat("neuralwatt/test-model", model_name="test-model")
+    assert model.get_client("key", async_=True) is not None
+
+
+@pytest.mark.skipif(
+    not os.path.isdir("/proc/self/fd"), reason="needs /proc to count open fds"
+)
+def test_async_prompts_release_event_loops_and_sockets(api_base):
+    """Prompts run under separate asyncio.run() calls must not pin their loops."""
+    model = NeuralWattAsyncChat(
+        "neuralwatt/test-model", model_name="test-model", api_base=api_base
+    )
+    loops = []
+
+    async def prompt():
+        loops.append(weakref.ref(asyncio.get_running_loop()))
+        return await model.prompt("Hi", key="key", stream=False).text()
+
+    # Warm up once so lazily imported modules don't count as leaks
+    assert asyncio.run(prompt()) == "Hello"
+    gc.collect()
+    fds_before = _open_fds()
+
+    for _ in range(10):
+        assert asyncio.run(prompt()) == "Hello"
+    gc.collect()
+
+    assert [loop for loop in loops if loop() is not None] == []
+    # Allow for the odd server-side socket still being torn down
+    assert _open_fds() - fds_before <= 2
@@ -6,6 +6,7 @@ import pytest
 import os
 import tempfile
 import json
+from click.testing import CliRunner
 
 
 def _get_api_key():
@@ -14,23 +15,43 @@ def _get_api_key():
         return f.read().strip()
 
 
-def _run_llm_command(cmd_args, timeout=30, use_api_key=True, database_file=None):
-    """Helper to run LLM commands with proper environment setup."""
-    env = os.environ.copy()
+@pytest.fixture(scope="module")
+def llm_cli():
+    """
+    Run llm commands in-process with click's CliRunner.
+
+    This avoids paying for interpreter start-up and plugin loading on every
+    command. test_llm_neuralwatt_model_availability still runs llm in a
+    subprocess, to catch import-time problems with the plugin.
+
+    In-process commands have no subprocess timeout, so each test using this
+    fixture carries a pytest-timeout marker allowing 30 seconds per prompt
+    and 10 per logs query, as the subprocess calls did.
+    """
+    from llm.cli import cli
+
+    return CliRunner(), cli
+
+
+def _run_llm_command(llm_cli, cmd_args, use_api_key=True, database_file=None):
+    """Helper to run LLM prompt commands with proper environment setup."""
+    runner, cli = llm_cli
+    env = {}
     if use_api_key:
         env["NEURALWATT_API_KEY"] = _get_api_key()
 
-    cmd = [sys.executable, "-m", "llm", "prompt"] + cmd_args
+    args = ["prompt"] + cmd_args
 
     # Add database file option if specified
     if database_file:
-        cmd.extend(["-d", database_file])
+        args.extend(["-d", database_file])
 
-    return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env)
+    return runner.invoke(cli, args, env=env)
 
 
 @pytest.mark.smoke_test
-def test_llm_neuralwatt_basic_connectivity():
+@pytest.mark.timeout(30)
+def test_llm_neuralwatt_basic_connectivity(llm_cli):
     """Basic API connectivity smoke test."""
     try:
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp_db:
@@ -38,6 +59,7 @@ def test_llm_neuralwatt_basic_connectivity():
 
         try:
             result = _run_llm_command(
+                llm_cli,
                 [
                     "Say hello world in one word",
                     "-m",
@@ -48,8 +70,8 @@ def test_llm_neuralwatt_basic_connectivity():
             )
 
             # Check that the command executed successfully
-            assert result.returncode == 0, (
-                f"LLM command failed with return code {result.returncode}: {result.stderr}"
+            assert result.exit_code == 0, (
+                f"LLM command failed with exit code {result.exit_code}: {result.output}"
             )
 
             # Check that we got a response
@@ -60,14 +82,13 @@ def test_llm_neuralwatt_basic_connectivity():
             if os.path.exists(db_file):
                 os.unlink(db_file)
 
-    except subprocess.TimeoutExpired:
-        pytest.fail("LLM command timed out - NeuralWatt API may be unreachable")
     except Exception as e:
         pytest.fail(f"Unexpected error during basic connectivity test: {e}")
 
 
 @pytest.mark.smoke_test
-def test_llm_neuralwatt_streaming_functionality():
+@pytest.mark.timeout(30)
+def test_llm_neuralwatt_streaming_functionality(llm_cli):
     """Streaming API functionality smoke test."""
     try:
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp_db:
@@ -75,14 +96,14 @@ def test_llm_neuralwatt_streaming_functionality():
 
         try:
             result = _run_llm_command(
+                llm_cli,
                 ["Say hello", "-m", "neuralwatt-gpt-oss"],
-                timeout=30,
                 database_file=db_file,
             )
 
             # Check that the command executed successfully
-            assert result.returncode == 0, (
-                f"LLM streaming command failed with return code {result.returncode}: {result.stderr}"
+            assert result.exit_code == 0, (
+                f"LLM streaming command failed with exit code {result.exit_code}: {result.output}"
             )
 
             # Check that we got a response
@@ -99,16 +120,13 @@ def test_llm_neuralwatt_streaming_functionality():
             if os.path.exists(db_file):
                 os.unlink(db_file)
 
-    except subprocess.TimeoutExpired:
-        pytest.fail(
-            "LLM streaming command timed out - NeuralWatt API may be unreachable"
-        )
     except Exception as e:
         pytest.fail(f"Unexpected error during streaming test: {e}")
 
 
 @pytest.mark.smoke_test
-def test_llm_neuralwatt_streaming_vs_non_streaming():
+@pytest.mark.timeout(60)
+def test_llm_neuralwatt_streaming_vs_non_streaming(llm_cli):
     """Compare streaming vs non-streaming responses."""
     try:
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp_db:
@@ -117,17 +135,19 @@ def test_llm_neuralwatt_streaming_vs_non_streaming():
         try:
             # Test with streaming (default)
             streaming_result = _run_llm_command(
+                llm_cli,
                 ["What is the capital of France?", "-m", "neuralwatt-gpt-oss"],
                 database_file=db_file,
             )
 
             # Check that the streaming command executed successfully
-            assert streaming_result.returncode == 0, (
-                f"Streaming command failed with return code {streaming_result.returncode}: {streaming_result.stderr}"
+            assert streaming_result.exit_code == 0, (
+                f"Streaming command failed with exit code {streaming_result.exit_code}: {streaming_result.output}"
             )
 
             # Test with explicit non-streaming
             non_streaming_result = _run_llm_command(
+                llm_cli,
                 [
                     "What is the capital of France?",
                     "-m",
@@ -138,8 +158,8 @@ def test_llm_neuralwatt_streaming_vs_non_streaming():
             )
 
             # Check that the non-streaming command executed successfully
-            assert non_streaming_result.returncode == 0, (
-                f"Non-streaming command failed with return code {non_streaming_result.returncode}: {non_streaming_result.stderr}"
+            assert non_streaming_result.exit_code == 0, (
+                f"Non-streaming command failed with exit code {non_streaming_result.exit_code}: {non_streaming_result.output}"
             )
 
             # Both should return responses
@@ -163,8 +183,6 @@ def test_llm_neuralwatt_streaming_vs_non_streaming():
             if os.path.exists(db_file):
                 os.unlink(db_file)
 
-    except subprocess.TimeoutExpired:
-        pytest.fail("LLM command timed out - NeuralWatt API may be unreachable")
     except Exception as e:
         pytest.fail(f"Unexpected error during streaming comparison test: {e}")
 
@@ -202,7 +220,8 @@ def test_llm_neuralwatt_model_availability():
 
 
 @pytest.mark.smoke_test
-def test_llm_neuralwatt_energy_logging():
+@pytest.mark.timeout(40)
+def test_llm_neuralwatt_energy_logging(llm_cli):
     """Test that energy data is properly logged and can be queried."""
     try:
         with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp_db:
@@ -211,34 +230,25 @@ def test_llm_neuralwatt_energy_logging():
         try:
             # Run a command to generate energy logs
             result = _run_llm_command(
+                llm_cli,
                 ["What is 2+2?", "-m", "neuralwatt-gpt-oss", "--no-stream"],
                 database_file=db_file,
             )
 
             # Check that the command executed successfully
-            assert result.returncode == 0, (
-                f"LLM command failed with return code {result.returncode}: {result.stderr}"
+            assert result.exit_code == 0, (
+                f"LLM command failed with exit code {result.exit_code}: {result.output}"
             )
 
             # Query the logs using the commands from the README
-            log_cmd = [
-                sys.executable,
-                "-m",
-                "llm",
-                "logs",
-                "--model",
-                "neuralwatt-gpt-oss",
-                "--json",
-                "-d",
-                db_file,
-            ]
-
-            log_result = subprocess.run(
-                log_cmd, capture_output=True, text=True, timeout=10
+            runner, cli = llm_cli
+            log_result = runner.invoke(
+                cli,
+                ["logs", "--model", "neuralwatt-gpt-oss", "--json", "-d", db_file],
             )
 
-            assert log_result.returncode == 0, (
-                f"LLM logs command failed with return code {log_result.returncode}: {log_result.stderr}"
+            assert log_result.exit_code == 0, (
+                f"LLM logs command failed with exit code {log_result.exit_code}: {log_result.output}"
             )
 
             # Parse the log output
@@ -319,8 +329,6 @@ def test_llm_neuralwatt_energy_logging():
             if os.path.exists(db_file):
                 os.unlink(db_file)
 
-    except subprocess.TimeoutExpired:
-        pytest.fail("Command timed out")
     except FileNotFoundError:
         pytest.skip("jq not found - skipping jq command tests")
     except Exception as e:
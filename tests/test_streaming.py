@@ -1,7 +1,32 @@
 """Tests for streaming energy data capture in llm-neuralwatt."""
 import json
+import math
 import pytest
-from llm_neuralwatt import EnergyCapturingSSEDecoder
+from llm.default_plugins.openai_models import combine_chunks, remove_dict_none_values
+from openai.types.chat import ChatCompletionChunk
+from llm_neuralwatt import (
+    ChunkCombiner,
+    EnergyCapturingSSEDecoder,
+    NeuralWattServerSentEvent,
+)
+
+
+class _AsyncChunks:
+    """Minimal async iterator over byte chunks, standing in for a response body."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._index = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._index >= len(self._chunks):
+            raise StopAsyncIteration
+        chunk = self._chunks[self._index]
+        self._index += 1
+        return chunk
 
 
 class TestEnergyCapturingSSEDecoder:
@@ -36,6 +61,30 @@ class TestEnergyCapturingSSEDecoder:
         
         assert result is not None
         assert result.data == '{"test": "value"}'
+        assert result.json() == {"test": "value"}
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            pytest.param(
+                '{"content": "\\ud83d"}', {"content": "\ud83d"}, id="lone-surrogate"
+            ),
+            pytest.param('{"score": NaN}', {"score": float("nan")}, id="nan"),
+        ],
+    )
+    def test_event_json_accepts_what_stdlib_json_accepts(self, data, expected):
+        """Payloads the stdlib json module accepts must still parse."""
+        event = NeuralWattServerSentEvent(data=data)
+        assert json.dumps(event.json()) == json.dumps(expected)
+
+    def test_energy_payload_accepts_what_stdlib_json_accepts(self):
+        """Energy payloads the stdlib json module accepts must not be dropped."""
+        decoder = EnergyCapturingSSEDecoder()
+        decoder.decode(': energy {"energy_joules": 1.5, "avg_power_watts": NaN}')
+
+        assert decoder.energy_data is not None
+        assert decoder.energy_data["energy_joules"] == 1.5
+        assert math.isnan(decoder.energy_data["avg_power_watts"])
 
     def test_handles_malformed_energy_json(self):
         """Malformed energy JSON should not crash."""
@@ -45,6 +94,27 @@ class TestEnergyCapturingSSEDecoder:
         assert result is None
         assert decoder.energy_data is None  # Should not be set
 
+    def test_later_energy_comment_replaces_earlier(self):
+        """A new energy comment replaces data that was already read."""
+        decoder = EnergyCapturingSSEDecoder()
+        decoder.decode(': energy {"energy_joules": 1.0}')
+        assert decoder.energy_data == {"energy_joules": 1.0}
+
+        decoder.decode(': energy {"energy_joules": 2.0}')
+        assert decoder.energy_data == {"energy_joules": 2.0}
+
+    @pytest.mark.parametrize("read_between", [False, True])
+    def test_malformed_energy_comment_keeps_earlier_data(self, read_between):
+        """A later malformed energy comment must not discard valid data."""
+        decoder = EnergyCapturingSSEDecoder()
+        decoder.decode(': energy {"energy_joules": 1.0}')
+        if read_between:
+            assert decoder.energy_data == {"energy_joules": 1.0}
+        decoder.decode(': energy {bad}')
+        decoder.decode('data: [DONE]')
+
+        assert decoder.energy_data == {"energy_joules": 1.0}
+
     def test_energy_data_initially_none(self):
         """Energy data should be None before any energy comment is seen."""
         decoder = EnergyCapturingSSEDecoder()
@@ -59,3 +129,128 @@ class TestEnergyCapturingSSEDecoder:
         assert decoder.energy_data['energy_joules'] == 30.42
         assert decoder.energy_data['avg_power_watts'] == 78.5
         assert decoder.energy_data['attribution_method'] == 'prorated'
+
+    @pytest.mark.parametrize(
+        "chunk_size",
+        [
+            pytest.param(None, id="single-buffer"),
+            pytest.param(7, id="split-mid-line"),
+        ],
+    )
+    def test_iter_bytes_captures_energy(self, chunk_size):
+        """Energy comments in a raw byte stream are captured without emitting events."""
+        decoder = EnergyCapturingSSEDecoder()
+        stream = (
+            b'data: {"choices": [{"delta": {"content": "Hello"}}]}\n\n'
+            b': keep-alive\n\n'
+            b': energy {"energy_joules": 15.23, "energy_kwh": 4.23e-06}\n\n'
+            b'data: [DONE]\n\n'
+        )
+        # Feed one contiguous buffer, as a real response body is read,
+        # or slice it so lines straddle network chunk boundaries
+        if chunk_size is None:
+            chunks = [stream]
+        else:
+            chunks = [
+                stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)
+            ]
+        events = list(decoder.iter_bytes(iter(chunks)))
+
+        assert [event.data for event in events] == [
+            '{"choices": [{"delta": {"content": "Hello"}}]}',
+            '[DONE]',
+        ]
+        assert decoder.energy_data == {"energy_joules": 15.23, "energy_kwh": 4.23e-06}
+
+    async def test_aiter_bytes_captures_energy(self):
+        """The async byte stream path captures energy data too."""
+        decoder = EnergyCapturingSSEDecoder()
+        chunks = [
+            b'data: {"choices": [{"delta": {"content": "Hello"}}]}\n\n',
+            b': energy {"energy_joules": 15.23}\n\n',
+            b'data: [DONE]\n\n',
+        ]
+        events = [event async for event in decoder.aiter_bytes(_AsyncChunks(chunks))]
+
+        assert [event.data for event in events][-1] == '[DONE]'
+        assert decoder.energy_data == {"energy_joules": 15.23}
+
+
+def _chunk(**kwargs):
+    data = {
+        "id": "chatcmpl-abc123",
+        "object": "chat.completion.chunk",
+        "created": 1737000000,
+        "model": "openai/gpt-oss-20b",
+        "choices": [],
+    }
+    data.update(kwargs)
+    return ChatCompletionChunk.model_validate(data)
+
+
+class TestChunkCombiner:
+    """Test incremental combining of streamed chunks."""
+
+    def test_matches_combine_chunks(self):
+        """The combined output should match llm's cleaned combine_chunks()."""
+        chunks = [
+            _chunk(choices=[{"index": 0, "delta": {"role": "assistant", "content": "Hel"}}]),
+            _chunk(choices=[{"index": 0, "delta": {"content": "lo"}}]),
+            _chunk(choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]),
+            _chunk(
+                usage={
+                    "prompt_tokens": 10,
+                    "completion_tokens": 2,
+                    "total_tokens": 12,
+                    "completion_tokens_details": {"reasoning_tokens": None},
+                    "prompt_tokens_details": None,
+                }
+            ),
+        ]
+        combiner = ChunkCombiner()
+        for chunk in chunks:
+            combiner.add(chunk)
+
+        assert combiner.combined() == remove_dict_none_values(combine_chunks(chunks))
+        assert combiner.combined()["content"] == "Hello"
+        assert combiner.combined()["finish_reason"] == "stop"
+
+    def test_empty_stream(self):
+        """No chunks should still give the cleaned combine_chunks() shape."""
+        assert ChunkCombiner().combined() == remove_dict_none_values(combine_chunks([]))
+
+    def test_returns_content_and_collects_tool_calls(self):
+        """add() returns each chunk's text and gathers tool call fragments."""
+        combiner = ChunkCombiner()
+        tool_delta = {
+            "index": 0,
+            "id": "call_1",
+            "type": "function",
+            "function": {"name": "lookup", "arguments": '{"q": '},
+        }
+        assert combiner.add(
+            _chunk(choices=[{"index": 0, "delta": {"content": "Hi"}}])
+        ) == "Hi"
+        assert combiner.add(
+            _chunk(choices=[{"index": 0, "delta": {"tool_calls": [tool_delta]}}])
+        ) is None
+        combiner.add(
+            _chunk(
+                choices=[
+                    {
+                        "index": 0,
+                        "delta": {
+                            "tool_calls": [
+                                {"index": 0, "function": {"arguments": '"x"}'}}
+                            ]
+                        },
+                    }
+                ]
+            )
+        )
+        assert combiner.add(_chunk(usage={"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2})) is None
+
+        tool_call, argument_parts = combiner.tool_calls[0]
+        assert tool_call.id == "call_1"
+        assert tool_call.function.name == "lookup"
+        assert "".join(argument_parts) == '{"q": "x"}'